@@ -1,8 +1,24 @@
 import pymssql  # CHANGED: pyodbc -> pymssql
 import re
+import string
 import json
+import hashlib
+import functools
+import asyncio
+import threading
+import time
+from collections import OrderedDict
 from datetime import date, datetime
-from groq import Groq
+from dateutil.relativedelta import relativedelta
+import numpy as np
+from fastembed import TextEmbedding
+import groq
+from groq import AsyncGroq
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+from sqlalchemy import create_engine, pool
+import sqlglot
+from sqlglot import exp
+from sqlglot.tokens import TokenType
 from dotenv import load_dotenv
 import os
 # =========================================================
@@ -14,33 +30,330 @@ load_dotenv()
 # THEN read env vars
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 MODEL_NAME = os.getenv("MODEL_NAME", "openai/gpt-oss-20b")
+GROQ_TIMEOUT_SECONDS = 20
 DB_NAME = os.getenv("DB_NAME")
 DB_SERVER = os.getenv("DB_SERVER")
 DB_USER = os.getenv("DB_USER")      # ADDED
 DB_PASSWORD = os.getenv("DB_PASSWORD")  # ADDED
 
-FORBIDDEN_SQL_PATTERN = r"\b(insert|update|delete|drop|alter|truncate|exec|merge|create)\b"
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
+QUERY_CACHE_SIZE = 1024
+SEMANTIC_HIT_THRESHOLD = 0.95   # reuse cached SQL as-is
+SEMANTIC_GRAY_THRESHOLD = 0.85  # reuse only if the result columns still match
+NEGATIVE_CACHE_TTL_SECONDS = 60  # how long a rejected question keeps failing fast
+SCHEMA_TTL_SECONDS = 300
+SCHEMA_TOP_K = 8  # tables sent to the LLM, before adding FK-referenced tables
+RESULT_ROW_LIMIT = 1000  # rows fetched per query; the answer only ever uses a slice
+FETCH_BATCH_SIZE = 256
+ANSWER_MAX_ROWS = 25
+ANSWER_WIDE_COLUMNS = 8  # above this, columns the question doesn't mention are dropped
+
+# Keywords need word boundaries; comment markers are matched anywhere.
+_FORBIDDEN_RE = re.compile(
+    r"\b(?:insert|update|delete|drop|alter|truncate|exec|merge|create)\b|/\*|--",
+    re.IGNORECASE,
+)
+# Literals compared in these expressions become sp_executesql parameters.
+_PARAMETERIZABLE_PARENTS = (exp.EQ, exp.NEQ, exp.GT, exp.GTE, exp.LT, exp.LTE, exp.Like, exp.In, exp.Between)
+# Unique stand-ins used to trace parsed literals back to their tokens.
+_MARKER_BASE = 7_000_000_000_000_000_000
+_MARKER_RE = re.compile(r"__p(\d+)__")
+# Values a question filters on: numbers, quoted text, capitalised names.
+# Capitalised words that are only sentence openers are not filter values.
+_QUESTION_STOP_WORDS = frozenset({
+    "a", "all", "an", "any", "are", "can", "count", "did", "display", "do", "does",
+    "find", "get", "give", "how", "i", "in", "is", "list", "me", "please", "show",
+    "tell", "the", "what", "when", "where", "which", "who", "whom", "whose", "why",
+})
+_QUESTION_LITERAL_RE = re.compile(r"\d+(?:\.\d+)?|\"[^\"]+\"|(?<!\w)'[^']+'(?!\w)|\b[A-Z][\w&.-]*")
+_JOINING_COLUMN_RE = re.compile(r"join|doj", re.IGNORECASE)
+_COLUMN_WORD_RE = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
 
 # =========================================================
-# GROQ CLIENT (UNCHANGED)
+# PROMPTS
 # =========================================================
-client = Groq(api_key=GROQ_API_KEY)
+# Static text goes first and stays byte-identical between calls so the
+# provider can reuse its cached prefix; per-question text goes last.
+# Prefixes are only cached from 1024 tokens up: SQL_GUIDELINES is about 1390
+# o200k tokens (the gpt-oss tokenizer), so keep it above that when trimming.
+SQL_GUIDELINES = """
+You are a precise enterprise HR assistant and an expert SQL Server developer.
+
+Task:
+- Generate a fully correct SELECT query for the user question.
+- Include in SELECT all columns that are:
+    - Used in WHERE, JOIN, GROUP BY, ORDER BY
+    - Relevant for a human-readable answer
+- Always use LEFT JOIN for related tables unless filtering requires INNER JOIN
+- Use dbo.TableName syntax
+- Do not invent any column names
+- Use TOP, ORDER BY, GROUP BY only if required
+
+Safety:
+- The query must be a single statement that starts with SELECT.
+- No comments inside the query.
+- Never emit INSERT, UPDATE, DELETE, DROP, ALTER, TRUNCATE, EXEC, MERGE or CREATE.
+
+T-SQL style:
+- Write keywords in upper case and table/column names exactly as they appear in the schema.
+- Qualify every column with a short table alias once more than one table is involved.
+- Use TOP (n) instead of LIMIT; SQL Server does not support LIMIT or OFFSET without ORDER BY.
+- Use GETDATE() for the current date and DATEDIFF / DATEADD for date arithmetic.
+- Compare dates with half-open ranges (>= start AND < next start) rather than BETWEEN on datetimes.
+- Use LIKE with N'...' literals for free-text name matching, e.g. e.EmployeeName LIKE N'%john%'.
+- Use COUNT(*) for "how many" questions and give aggregates a readable alias with AS.
+- Use ISNULL / COALESCE only when a missing value would change the answer.
+- Prefer a single query over several; use a derived table instead of a CTE (queries must start with SELECT).
+- When the question names a department, designation, location or status, filter on the
+  descriptive column of the related lookup table rather than guessing an ID.
+
+Examples (illustrative only; always use the tables and columns from the schema provided):
+
+Question: How many employees are there?
+SQL: SELECT COUNT(*) AS EmployeeCount FROM dbo.Employee
+
+Question: List the five most recently joined employees.
+SQL: SELECT TOP (5) e.EmployeeName, e.JoiningDate FROM dbo.Employee e ORDER BY e.JoiningDate DESC
+
+Question: Who works in the Sales department?
+SQL: SELECT e.EmployeeName, d.DepartmentName FROM dbo.Employee e LEFT JOIN dbo.Department d ON d.DepartmentId = e.DepartmentId WHERE d.DepartmentName = N'Sales'
+
+Question: How many employees are in each department?
+SQL: SELECT d.DepartmentName, COUNT(e.EmployeeId) AS EmployeeCount FROM dbo.Department d LEFT JOIN dbo.Employee e ON e.DepartmentId = d.DepartmentId GROUP BY d.DepartmentName ORDER BY EmployeeCount DESC
+
+Question: Which employees joined in the last 90 days?
+SQL: SELECT e.EmployeeName, e.JoiningDate FROM dbo.Employee e WHERE e.JoiningDate >= DATEADD(DAY, -90, CAST(GETDATE() AS date)) ORDER BY e.JoiningDate DESC
+
+Question: What is John's designation and who is his manager?
+SQL: SELECT e.EmployeeName, g.DesignationName, m.EmployeeName AS ManagerName FROM dbo.Employee e LEFT JOIN dbo.Designation g ON g.DesignationId = e.DesignationId LEFT JOIN dbo.Employee m ON m.EmployeeId = e.ManagerId WHERE e.EmployeeName LIKE N'%john%'
+
+Question: Which departments have more than ten employees?
+SQL: SELECT d.DepartmentName, COUNT(e.EmployeeId) AS EmployeeCount FROM dbo.Department d INNER JOIN dbo.Employee e ON e.DepartmentId = d.DepartmentId GROUP BY d.DepartmentName HAVING COUNT(e.EmployeeId) > 10
+
+Question: How many leave days did each employee take this year?
+SQL: SELECT e.EmployeeName, SUM(l.LeaveDays) AS LeaveDaysTaken FROM dbo.Employee e LEFT JOIN dbo.LeaveApplication l ON l.EmployeeId = e.EmployeeId AND l.FromDate >= DATEFROMPARTS(YEAR(GETDATE()), 1, 1) GROUP BY e.EmployeeName ORDER BY LeaveDaysTaken DESC
+
+Question: Which employees joined in 2021?
+SQL: SELECT e.EmployeeName, e.JoiningDate FROM dbo.Employee e WHERE e.JoiningDate >= '2021-01-01' AND e.JoiningDate < '2022-01-01' ORDER BY e.JoiningDate
+
+Question: Who has been with the company the longest?
+SQL: SELECT TOP (1) e.EmployeeName, e.JoiningDate, DATEDIFF(YEAR, e.JoiningDate, GETDATE()) AS YearsOfService FROM dbo.Employee e WHERE e.JoiningDate IS NOT NULL ORDER BY e.JoiningDate ASC
+
+Question: Which employees do not have a manager assigned?
+SQL: SELECT e.EmployeeName, d.DepartmentName FROM dbo.Employee e LEFT JOIN dbo.Department d ON d.DepartmentId = e.DepartmentId WHERE e.ManagerId IS NULL
+
+Question: How many people report to each manager?
+SQL: SELECT m.EmployeeName AS ManagerName, COUNT(e.EmployeeId) AS DirectReports FROM dbo.Employee e INNER JOIN dbo.Employee m ON m.EmployeeId = e.ManagerId GROUP BY m.EmployeeName ORDER BY DirectReports DESC
+
+Question: Which departments have no employees?
+SQL: SELECT d.DepartmentName FROM dbo.Department d LEFT JOIN dbo.Employee e ON e.DepartmentId = d.DepartmentId WHERE e.EmployeeId IS NULL
+
+Question: Who is on leave today?
+SQL: SELECT e.EmployeeName, l.FromDate, l.ToDate FROM dbo.LeaveApplication l INNER JOIN dbo.Employee e ON e.EmployeeId = l.EmployeeId WHERE l.FromDate <= CAST(GETDATE() AS date) AND l.ToDate >= CAST(GETDATE() AS date)
+
+Question: How many employees joined each month this year?
+SQL: SELECT MONTH(e.JoiningDate) AS JoiningMonth, COUNT(*) AS EmployeeCount FROM dbo.Employee e WHERE e.JoiningDate >= DATEFROMPARTS(YEAR(GETDATE()), 1, 1) GROUP BY MONTH(e.JoiningDate) ORDER BY JoiningMonth
+
+Question: What is the average length of service in each department?
+SQL: SELECT d.DepartmentName, AVG(DATEDIFF(MONTH, e.JoiningDate, GETDATE())) / 12.0 AS AvgYearsOfService FROM dbo.Employee e INNER JOIN dbo.Department d ON d.DepartmentId = e.DepartmentId GROUP BY d.DepartmentName ORDER BY AvgYearsOfService DESC
+
+Question: Which managers have more direct reports than the average manager?
+SQL: SELECT r.ManagerName, r.DirectReports FROM (SELECT m.EmployeeName AS ManagerName, COUNT(*) AS DirectReports FROM dbo.Employee e INNER JOIN dbo.Employee m ON m.EmployeeId = e.ManagerId GROUP BY m.EmployeeName) r WHERE r.DirectReports > (SELECT AVG(CAST(c.Reports AS float)) FROM (SELECT COUNT(*) AS Reports FROM dbo.Employee x WHERE x.ManagerId IS NOT NULL GROUP BY x.ManagerId) c)
+""".strip()
+
+# Both SQL prompts share SQL_GUIDELINES as their cached prefix and differ
+# only in the output format appended after it.
+STATIC_INSTRUCTIONS = SQL_GUIDELINES + """
+
+Output format:
+- Return a JSON object with exactly one key: {"sql": "<the query>"}.
+- The query is a plain string, without markdown fences.
+"""
+
+PLAN_INSTRUCTIONS = SQL_GUIDELINES + """
 
-def groq_call(prompt, temperature=0):
-    response = client.chat.completions.create(
+Output format:
+- Return a JSON object with exactly two keys: "sql" and "answer_template".
+- "sql": the query as a plain string, without markdown fences.
+- "answer_template": one line answering the question for a single result row, where every
+  value from the database is a {ColumnName} placeholder naming a column the query returns,
+  e.g. "{EmployeeName} joined on {JoiningDate}". It is filled in once per returned row.
+- Set "answer_template" to null when the answer needs anything beyond reading values off
+  each row: comparisons, totals across rows, summaries, experience, or judgement.
+"""
+
+ANSWER_INSTRUCTIONS = """
+You are a senior HR assistant.
+
+Rules:
+- Give concise, human-readable answers
+- If multiple rows, use numbered list
+- Include experience where relevant
+- Do not invent data
+- The database result gives the column names once, then each row's values in that order
+- If the result has "_truncated", that many further rows exist; mention them without listing them
+- If the database result is empty, say that no matching records were found
+""".strip()
+
+# =========================================================
+# GROQ CLIENT
+# =========================================================
+# Retries are handled by tenacity below, so the SDK's own retries are off.
+client = AsyncGroq(api_key=GROQ_API_KEY, max_retries=0, timeout=GROQ_TIMEOUT_SECONDS)
+
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_random_exponential(min=0.5, max=8),
+    retry=retry_if_exception_type((groq.RateLimitError, groq.APIConnectionError, groq.InternalServerError)),
+    reraise=True,
+)
+async def _create_completion(**kwargs):
+    return await client.chat.completions.create(**kwargs)
+
+async def groq_call(system, user, temperature=0, json_mode=False):
+    extra = {"response_format": {"type": "json_object"}} if json_mode else {}
+    response = await _create_completion(
         model=MODEL_NAME,
         temperature=temperature,
+        **extra,
         messages=[
-            {"role": "system", "content": "You are a precise enterprise HR assistant."},
-            {"role": "user", "content": prompt}
+            {"role": "system", "content": system},
+            {"role": "user", "content": user}
         ]
     )
     return response.choices[0].message.content.strip()
 
+async def groq_call_stream(system, user, temperature=0):
+    stream = await _create_completion(
+        model=MODEL_NAME,
+        temperature=temperature,
+        stream=True,
+        messages=[
+            {"role": "system", "content": system},
+            {"role": "user", "content": user}
+        ]
+    )
+    async for chunk in stream:
+        yield chunk.choices[0].delta.content or ""
+
 # =========================================================
-# DATABASE CONNECTION (ONLY THIS CHANGED)
+# QUERY CACHE
 # =========================================================
-def get_connection():
+_embedder = None
+_embedder_lock = threading.Lock()
+
+def _embedder_singleton():
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            _embedder = TextEmbedding(EMBEDDING_MODEL)
+    return _embedder
+
+def _normalize_question(question: str) -> str:
+    return question.strip().lower()
+
+def question_literals(question: str) -> frozenset:
+    """
+    The filter values in a question. Near-duplicate questions that differ
+    here ("who works in Sales" / "in Marketing") need different SQL.
+    Capitalised stop-words ("Who", "List") are skipped; numbers and quoted
+    text never are.
+    """
+    values = set()
+    for match in _QUESTION_LITERAL_RE.findall(question):
+        value = match.strip("\"'").lower()
+        if match[0].isupper() and value in _QUESTION_STOP_WORDS:
+            continue
+        values.add(value)
+    return frozenset(values)
+
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+def embed_text(text: str):
+    vector = next(iter(_embedder_singleton().embed([text])))
+    vector = vector / np.linalg.norm(vector)
+    vector.setflags(write=False)
+    return vector
+
+class QueryCache:
+    """
+    Two-tier cache of generated SQL:
+    - exact tier keyed on a hash of the normalized question
+    - semantic tier matched by cosine similarity of question embeddings
+    Entries carry a status: "ok" for usable SQL, or "unsafe" / "syntax_error"
+    for questions whose SQL was rejected, which expire after a TTL.
+    Thread-safe: load_schema clears it from worker threads while lookups
+    run on the event loop.
+    """
+
+    def __init__(self, maxsize=QUERY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(question: str) -> str:
+        return hashlib.blake2b(_normalize_question(question).encode()).hexdigest()
+
+    def _evict_expired(self):
+        # Caller holds self._lock.
+        now = time.monotonic()
+        expired = [k for k, e in self._entries.items() if e["expires_at"] is not None and e["expires_at"] <= now]
+        for k in expired:
+            del self._entries[k]
+
+    def get(self, question: str):
+        """
+        Return (entry, score, exact) for the best match, or
+        (None, 0.0, False) on a miss; exact is True for a same-question hit.
+        """
+        key = self._key(question)
+        embedding = embed_text(_normalize_question(question))  # outside the lock
+        with self._lock:
+            self._evict_expired()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry, 1.0, True
+            if not self._entries:
+                return None, 0.0, False
+
+            keys = list(self._entries)
+            vectors = np.stack([self._entries[k]["embedding"] for k in keys])
+            scores = vectors @ embedding
+            best = int(np.argmax(scores))
+            if scores[best] < SEMANTIC_GRAY_THRESHOLD:
+                return None, 0.0, False
+            self._entries.move_to_end(keys[best])
+            return self._entries[keys[best]], float(scores[best]), False
+
+    def set(self, question: str, sql, columns=(), answer_template=None, status="ok", error=None, ttl=None):
+        key = self._key(question)
+        entry = {
+            "sql": sql,
+            "columns": frozenset(columns),
+            "answer_template": answer_template,
+            "literals": question_literals(question),
+            "status": status,
+            "error": error,
+            "expires_at": time.monotonic() + ttl if ttl is not None else None,
+            "embedding": embed_text(_normalize_question(question)),
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+query_cache = QueryCache()
+
+# =========================================================
+# DATABASE CONNECTION
+# =========================================================
+def _connect():
     return pymssql.connect(  # CHANGED: pyodbc -> pymssql
         server=DB_SERVER,
         user=DB_USER,
@@ -49,12 +362,34 @@ def get_connection():
         timeout=30
     )
 
+engine = create_engine(
+    "mssql+pymssql://",
+    creator=_connect,
+    poolclass=pool.QueuePool,
+    pool_size=8,
+    max_overflow=4,
+    pool_pre_ping=True,
+)
+
+def get_connection():
+    # close() on the returned connection hands it back to the pool
+    return engine.raw_connection()
+
 # =========================================================
-# ALL BELOW UNCHANGED
+# SCHEMA, SQL AND ANSWERS
 # =========================================================
-def load_schema():
-    conn = get_connection()
-    cursor = conn.cursor()
+_schema_cache = None  # (version, schema, loaded_at)
+_schema_index = None  # {"tables", "vectors", "references"} for the cached schema
+_table_vectors = {}   # table description -> embedding, survives reloads
+
+def _schema_version(cursor):
+    cursor.execute("""
+        SELECT CHECKSUM_AGG(CHECKSUM(TABLE_NAME, COLUMN_NAME, DATA_TYPE))
+        FROM INFORMATION_SCHEMA.COLUMNS
+    """)
+    return cursor.fetchone()[0]
+
+def _introspect_schema(cursor):
     cursor.execute("""
         SELECT TABLE_NAME, COLUMN_NAME
         FROM INFORMATION_SCHEMA.COLUMNS
@@ -63,93 +398,426 @@ def load_schema():
     schema = {}
     for table, column in cursor.fetchall():
         schema.setdefault(table, []).append(column)
-    conn.close()
     return schema
 
-def sanitize_sql(sql: str) -> str:
-    sql = re.sub(r"```sql|```", "", sql, flags=re.IGNORECASE)
-    sql = sql.replace("`", "").strip()
-    return sql
+def _introspect_foreign_keys(cursor):
+    """Map each table to the tables its foreign keys reference."""
+    cursor.execute("""
+        SELECT fk.TABLE_NAME, pk.TABLE_NAME
+        FROM INFORMATION_SCHEMA.REFERENTIAL_CONSTRAINTS rc
+        JOIN INFORMATION_SCHEMA.TABLE_CONSTRAINTS fk
+            ON fk.CONSTRAINT_SCHEMA = rc.CONSTRAINT_SCHEMA
+            AND fk.CONSTRAINT_NAME = rc.CONSTRAINT_NAME
+        JOIN INFORMATION_SCHEMA.TABLE_CONSTRAINTS pk
+            ON pk.CONSTRAINT_SCHEMA = rc.UNIQUE_CONSTRAINT_SCHEMA
+            AND pk.CONSTRAINT_NAME = rc.UNIQUE_CONSTRAINT_NAME
+    """)
+    references = {}
+    for table, referenced in cursor.fetchall():
+        references.setdefault(table, set()).add(referenced)
+    return references
 
-def validate_sql(sql: str):
-    sql_lower = sql.lower().strip()
-    if not sql_lower.startswith("select"):
-        raise ValueError("Only SELECT queries allowed")
-    if re.search(FORBIDDEN_SQL_PATTERN, sql_lower):
-        raise ValueError("Unsafe SQL detected")
+def _table_text(table, cols):
+    return f"{table}({', '.join(cols)})"
 
-def generate_sql(question: str, schema: dict) -> str:
-    schema_text = "\n".join(f"{table}({', '.join(cols)})" for table, cols in schema.items())
-    prompt = f"""
-You are an expert SQL Server developer.
+def _build_schema_index(schema, references):
+    tables = list(schema)
+    texts = [_table_text(table, schema[table]) for table in tables]
+    missing = [text for text in texts if text not in _table_vectors]
+    for text, vector in zip(missing, _embedder_singleton().embed(missing)):
+        _table_vectors[text] = vector / np.linalg.norm(vector)
+    return {
+        "tables": tables,
+        "vectors": np.stack([_table_vectors[text] for text in texts]) if texts else None,
+        "references": references,
+    }
 
-Task:
-- Generate a fully correct SELECT query for the user question.
-- Include in SELECT all columns that are:
-    - Used in WHERE, JOIN, GROUP BY, ORDER BY
-    - Relevant for a human-readable answer
-- Always use LEFT JOIN for related tables unless filtering requires INNER JOIN
-- Use dbo.TableName syntax
-- Do not invent any column names
-- Use TOP, ORDER BY, GROUP BY only if required
+def relevant_schema(question: str, schema: dict) -> dict:
+    """
+    Narrow the schema to the SCHEMA_TOP_K tables most similar to the
+    question, plus every table reachable from them through foreign keys.
+    """
+    index = _schema_index
+    if len(schema) <= SCHEMA_TOP_K or index is None or index["tables"] != list(schema):
+        return schema
+
+    scores = index["vectors"] @ embed_text(_normalize_question(question))
+    pending = [index["tables"][i] for i in np.argsort(scores)[::-1][:SCHEMA_TOP_K]]
+    selected = set()
+    while pending:
+        table = pending.pop()
+        if table not in selected:
+            selected.add(table)
+            pending.extend(index["references"].get(table, ()))
+    return {table: cols for table, cols in schema.items() if table in selected}
+
+def load_schema():
+    """
+    Return the cached schema, re-introspecting only when the
+    INFORMATION_SCHEMA checksum changes or the TTL has expired.
+    """
+    global _schema_cache, _schema_index
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        version = _schema_version(cursor)
+        if _schema_cache is not None:
+            cached_version, schema, loaded_at = _schema_cache
+            if cached_version == version and time.monotonic() - loaded_at <= SCHEMA_TTL_SECONDS:
+                return schema
+            if cached_version != version:
+                query_cache.clear()
+        schema = _introspect_schema(cursor)
+        references = _introspect_foreign_keys(cursor)
+    finally:
+        conn.close()
+    _schema_index = _build_schema_index(schema, references)
+    _schema_cache = (version, schema, time.monotonic())
+    return schema
 
+class UnsafeSQLError(ValueError):
+    """Generated SQL was rejected by validate_sql."""
+
+def validate_sql(sql: str):
+    if sql.lstrip()[:6].lower() != "select":
+        raise UnsafeSQLError("Only SELECT queries allowed")
+    if _FORBIDDEN_RE.search(sql):
+        raise UnsafeSQLError("Unsafe SQL detected")
+
+async def _sql_prompt(question: str, schema: dict) -> str:
+    schema = await asyncio.to_thread(relevant_schema, question, schema)
+    schema_text = "\n".join(_table_text(table, cols) for table, cols in schema.items())
+    # The schema slice varies per question, so it goes in the user message
+    # to keep the system prompt a stable cacheable prefix.
+    return f"""
 Database Schema:
 {schema_text}
 
 User Question:
 {question}
-
-Return ONLY the raw SQL.
 """
-    raw_sql = groq_call(prompt, temperature=0)
-    sql = sanitize_sql(raw_sql)
+
+async def generate_sql(question: str, schema: dict) -> str:
+    user = await _sql_prompt(question, schema)
+    raw = await groq_call(STATIC_INSTRUCTIONS, user, temperature=0, json_mode=True)
+    try:
+        sql = json.loads(raw)["sql"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Model did not return a SQL query")
+    if not isinstance(sql, str):
+        raise ValueError("Model did not return a SQL query")
     validate_sql(sql)
     return sql
 
-def execute_sql(sql: str):
+async def generate_sql_and_plan(question: str, schema: dict):
+    """
+    Ask for the SQL and an answer template in one call.
+    Returns (sql, answer_template); the template is None when the model
+    declines one, and a malformed reply falls back to generate_sql.
+    """
+    user = await _sql_prompt(question, schema)
+    raw = await groq_call(PLAN_INSTRUCTIONS, user, temperature=0, json_mode=True)
+    try:
+        plan = json.loads(raw)
+        sql = plan["sql"]
+        template = plan.get("answer_template")
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return await generate_sql(question, schema), None
+    if not isinstance(sql, str):
+        return await generate_sql(question, schema), None
     validate_sql(sql)
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(sql)
-    cols = [c[0] for c in cursor.description]
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(zip(cols, row)) for row in rows]
-
-def calculate_experience(joining_date):
+    return sql, template if isinstance(template, str) else None
+
+def _literal_marker(index: int, token) -> str:
+    """A unique stand-in for a literal token that parses the same way."""
+    if token.token_type == TokenType.NUMBER:
+        return str(_MARKER_BASE + index)
+    prefix = "N" if token.token_type == TokenType.NATIONAL_STRING else ""
+    return f"{prefix}'__p{index}__'"
+
+def _parameter_declaration(token, value):
+    if token.token_type == TokenType.NATIONAL_STRING:
+        return "nvarchar(4000)" if len(value) <= 4000 else "nvarchar(max)"
+    if token.token_type == TokenType.STRING:
+        # Matches the literal's own varchar type so varchar columns stay seekable.
+        return "varchar(8000)" if len(value) <= 8000 else "varchar(max)"
+    return "int" if -2**31 <= value < 2**31 else "bigint"
+
+def _marker_index(literal):
+    text = literal.this
+    if isinstance(literal, exp.Literal) and not literal.is_string:
+        return int(text) - _MARKER_BASE if text.isdigit() and int(text) >= _MARKER_BASE else None
+    match = _MARKER_RE.fullmatch(text)
+    return int(match.group(1)) if match else None
+
+def parameterize_sql(sql: str):
+    """
+    Move string and integer literals compared in WHERE / ON clauses into
+    sp_executesql parameters, so literal variants of the same query share
+    one cached plan on SQL Server.
+    sqlglot is only used to locate the literals: @pN is spliced into the
+    original text at each literal's offsets, never a re-rendered query.
+    Returns (statement, params); params is None when sql is left as-is.
+    """
+    try:
+        tokens = sqlglot.Dialect.get_or_raise("tsql").tokenize(sql)
+        literals = {
+            i: token for i, token in enumerate(tokens)
+            if token.token_type in (TokenType.STRING, TokenType.NATIONAL_STRING)
+            # Integers past bigint stay literal; SQL Server types those as numeric.
+            or (token.token_type == TokenType.NUMBER and token.text.isdigit() and int(token.text) < 2**63)
+        }
+        if not literals:
+            return sql, None
+        # Parse a copy with every literal swapped for a unique marker so each
+        # AST literal can be traced back to its token.
+        marked, pos = [], 0
+        for i, token in literals.items():
+            marked.append(sql[pos:token.start])
+            marked.append(_literal_marker(i, token))
+            pos = token.end + 1
+        marked.append(sql[pos:])
+        tree = sqlglot.parse_one("".join(marked), read="tsql")
+    except sqlglot.errors.SqlglotError:
+        return sql, None
+
+    selected = set()
+    for literal in tree.find_all(exp.Literal, exp.National):
+        index = _marker_index(literal)
+        if index not in literals:
+            continue
+        node = literal.parent if isinstance(literal.parent, exp.Neg) else literal
+        if not isinstance(node.parent, _PARAMETERIZABLE_PARENTS):
+            continue
+        if literal.find_ancestor(exp.Where, exp.Join) is None:
+            continue
+        selected.add(index)
+
+    if not selected:
+        return sql, None
+    pieces, declarations, values, pos = [], [], [], 0
+    for i in sorted(selected):
+        token = literals[i]
+        value = int(token.text) if token.token_type == TokenType.NUMBER else token.text
+        name = f"@p{len(values)}"
+        pieces.append(sql[pos:token.start])
+        pieces.append(name)
+        pos = token.end + 1
+        declarations.append(f"{name} {_parameter_declaration(token, value)}")
+        values.append(value)
+    pieces.append(sql[pos:])
+
+    # pymssql interpolates %s client-side; the statement and values travel as
+    # sp_executesql arguments, so the server still sees a parameterized query.
+    statement = "EXEC sp_executesql %s, %s, " + ", ".join(f"@p{i} = %s" for i in range(len(values)))
+    return statement, ("".join(pieces), ", ".join(declarations), *values)
+
+def iter_rows(cursor, limit=RESULT_ROW_LIMIT):
+    """Yield at most limit rows from an executed cursor, FETCH_BATCH_SIZE at a time."""
+    remaining = limit
+    while remaining > 0:
+        batch = cursor.fetchmany(min(FETCH_BATCH_SIZE, remaining))
+        if not batch:
+            return
+        remaining -= len(batch)
+        yield from batch
+
+def _reset_rowcount(conn, cursor):
+    try:
+        cursor.execute("SET ROWCOUNT 0")
+    except Exception:
+        # Don't mask the query's own error; a connection still carrying the
+        # row limit must not go back to the pool.
+        conn.invalidate()
+
+def _fetch(conn, sql: str, limit=RESULT_ROW_LIMIT):
+    try:
+        validate_sql(sql)
+        statement, params = parameterize_sql(sql)
+        cursor = conn.cursor()
+        cursor.arraysize = FETCH_BATCH_SIZE
+        # Have the server stop after limit rows rather than sending rows we'd
+        # discard; reset before the connection goes back to the pool.
+        cursor.execute(f"SET ROWCOUNT {int(limit)}")
+        try:
+            cursor.execute(statement, params)
+            cols = tuple(c[0] for c in cursor.description)
+            rows = list(iter_rows(cursor, limit))
+        finally:
+            _reset_rowcount(conn, cursor)
+    finally:
+        conn.close()
+    # Column names are kept once instead of being repeated in a dict per row.
+    return {"columns": cols, "rows": rows}
+
+async def execute_sql(sql: str, conn=None):
+    """Run sql in a worker thread; takes ownership of conn if one is given."""
+    if conn is None:
+        conn = await asyncio.to_thread(get_connection)
+    return await asyncio.to_thread(_fetch, conn, sql)
+
+def calculate_experience(joining_date, _today=None):
     if not joining_date:
         return "N/A"
     if isinstance(joining_date, datetime):
         joining_date = joining_date.date()
-    today = date.today()
-    delta = today - joining_date
-    years = delta.days // 365
-    months = (delta.days % 365) // 30
-    return f"{years} years {months} months"
-
-def generate_answer(question: str, data: list):
-    prompt = f"""
-You are a senior HR assistant.
+    return _experience(joining_date, _today or date.today())
 
+@functools.lru_cache(maxsize=4096)
+def _experience(joining_date: date, today: date) -> str:
+    delta = relativedelta(today, joining_date)
+    return f"{delta.years} years {delta.months} months"
+
+def _with_experience(data: dict, _today: date) -> dict:
+    """Append an Experience column computed from the first joining-date column."""
+    cols, rows = data["columns"], data["rows"]
+    if "Experience" in cols or not rows:
+        return data
+    for i, col in enumerate(cols):
+        sample = next((row[i] for row in rows if row[i] is not None), None)
+        if _JOINING_COLUMN_RE.search(col) and isinstance(sample, date):
+            return {
+                "columns": cols + ("Experience",),
+                "rows": [row + (calculate_experience(row[i], _today),) for row in rows],
+            }
+    return data
+
+def _mentioned(column: str, question: str) -> bool:
+    words = [w.lower() for w in _COLUMN_WORD_RE.findall(column) if len(w) >= 3]
+    return words[-1:] == ["name"] or any(w in question for w in words)
+
+def _more_rows(data: dict) -> str:
+    """Count of rows beyond ANSWER_MAX_ROWS; "N+" when the fetch hit RESULT_ROW_LIMIT."""
+    more = len(data["rows"]) - ANSWER_MAX_ROWS
+    return f"{more}+" if len(data["rows"]) >= RESULT_ROW_LIMIT else str(more)
+
+def _answer_payload(question: str, data: dict) -> dict:
+    """
+    Trim the result to the first ANSWER_MAX_ROWS rows and, for wide
+    results, to the columns the question mentions (plus name columns).
+    """
+    cols, rows = data["columns"], data["rows"][:ANSWER_MAX_ROWS]
+    if len(cols) > ANSWER_WIDE_COLUMNS:
+        normalized = _normalize_question(question)
+        keep = [i for i, col in enumerate(cols) if _mentioned(col, normalized)]
+        if keep:
+            cols = tuple(cols[i] for i in keep)
+            rows = [tuple(row[i] for i in keep) for row in rows]
+    payload = {"columns": cols, "rows": rows}
+    if len(data["rows"]) > ANSWER_MAX_ROWS:
+        payload["_truncated"] = _more_rows(data)
+    return payload
+
+def generate_answer(question: str, data: dict):
+    """Return an async generator of answer text chunks as the model emits them."""
+    user = f"""
 Question:
 {question}
 
 Database Result:
-{json.dumps(data, default=str)}
-
-Rules:
-- Give concise, human-readable answers
-- If multiple rows, use numbered list
-- Include experience where relevant
-- Do not invent data
+{json.dumps(_answer_payload(question, data), separators=(",", ":"), default=str)}
 """
-    return groq_call(prompt)
+    return groq_call_stream(ANSWER_INSTRUCTIONS, user)
+
+def render_answer(template, data: dict):
+    """
+    Fill answer_template once per row, client-side.
+    Returns None when the template can't be used as-is: it has no
+    placeholders, references a column the result lacks, uses format
+    specs, or there are no rows to fill it with.
+    """
+    if not template or not data["rows"]:
+        return None
+    try:
+        fields = [(f, spec, conv) for _, f, spec, conv in string.Formatter().parse(template) if f is not None]
+    except ValueError:
+        return None
+    if not fields or any(f not in data["columns"] or spec or conv for f, spec, conv in fields):
+        return None
+
+    cols, rows = data["columns"], data["rows"]
+    lines = [
+        template.format(**{col: "N/A" if value is None else value for col, value in zip(cols, row)})
+        for row in rows[:ANSWER_MAX_ROWS]
+    ]
+    if len(lines) == 1:
+        return lines[0]
+    answer = "\n".join(f"{n}. {line}" for n, line in enumerate(lines, 1))
+    if len(rows) > ANSWER_MAX_ROWS:
+        answer += f"\n\n...and {_more_rows(data)} more."
+    return answer
 
-def ask_hr_bot(question: str):
-    schema = load_schema()
-    sql = generate_sql(question, schema)
-    data = execute_sql(sql)
-    answer = generate_answer(question, data)
+async def _as_stream(text: str):
+    yield text
+
+async def _cached_sql(question: str):
+    """
+    Look up SQL for a previously answered question.
+    Any match other than the same question must mention the same filter
+    values. Gray-zone matches are also re-run and only accepted if they
+    still return the same column set they returned when cached.
+    A close match on a rejected question raises its cached error.
+    Returns (sql, data, answer_template), all None on a miss.
+    """
+    entry, score, exact = query_cache.get(question)
+    if entry is None:
+        return None, None, None
+    # "joined in 2021" and "joined in 2022" embed almost identically.
+    if not exact and entry["literals"] != question_literals(question):
+        return None, None, None
+    if entry["status"] != "ok":
+        if score >= SEMANTIC_HIT_THRESHOLD:
+            raise ValueError(entry["error"])
+        return None, None, None
+    try:
+        data = await execute_sql(entry["sql"])
+    except Exception:
+        return None, None, None
+    if score < SEMANTIC_HIT_THRESHOLD:
+        if frozenset(data["columns"]) != entry["columns"]:
+            return None, None, None
+        # The template was phrased for a different question.
+        return entry["sql"], data, None
+    return entry["sql"], data, entry["answer_template"]
+
+async def _generate_sql_with_connection(question: str, schema: dict):
+    """Generate SQL and an answer template while a DB connection is opened in parallel."""
+    conn_task = asyncio.create_task(asyncio.to_thread(get_connection))
+    try:
+        sql, template = await generate_sql_and_plan(question, schema)
+    except Exception:
+        try:
+            (await conn_task).close()
+        except Exception:
+            pass  # keep the generation error, not the connection one
+        raise
+    return sql, template, await conn_task
+
+async def ask_hr_bot(question: str):
+    # The schema check must finish before the cache lookup so a schema change
+    # invalidates stale entries; the question embedding is computed alongside.
+    schema, _ = await asyncio.gather(
+        asyncio.to_thread(load_schema),
+        asyncio.to_thread(embed_text, _normalize_question(question)),
+    )
+    sql, data, template = await _cached_sql(question)
+    if sql is None:
+        try:
+            sql, template, conn = await _generate_sql_with_connection(question, schema)
+        except UnsafeSQLError as e:
+            # Malformed model output is not cached: it is usually a one-off.
+            query_cache.set(question, None, status="unsafe", error=str(e), ttl=NEGATIVE_CACHE_TTL_SECONDS)
+            raise
+        try:
+            data = await execute_sql(sql, conn)
+        except pymssql.ProgrammingError as e:
+            query_cache.set(question, sql, status="syntax_error", error=str(e), ttl=NEGATIVE_CACHE_TTL_SECONDS)
+            raise
+        query_cache.set(question, sql, data["columns"], answer_template=template)
+    data = _with_experience(data, _today=date.today())
+    # Fast path: a usable template answers without a second LLM call.
+    rendered = render_answer(template, data)
+    answer = _as_stream(rendered) if rendered is not None else generate_answer(question, data)
     return {
         "sql": sql,
         "answer": answer,
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# groq_trial2 builds its Groq client at import time; tests never call the API.
+os.environ.setdefault("GROQ_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
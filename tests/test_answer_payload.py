@@ -0,0 +1,36 @@
+from groq_trial2 import ANSWER_MAX_ROWS, ANSWER_WIDE_COLUMNS, RESULT_ROW_LIMIT, _answer_payload
+
+WIDE = ("EmployeeId", "EmployeeName", "JoiningDate", "DepartmentName", "ManagerName",
+        "Email", "Phone", "City", "Salary")
+
+
+def test_short_result_is_passed_through():
+    data = {"columns": ("EmployeeName",), "rows": [("Ravi",), ("Anita",)]}
+    assert _answer_payload("Who works here?", data) == data
+
+
+def test_rows_beyond_the_limit_are_counted():
+    rows = [(i,) for i in range(ANSWER_MAX_ROWS + 5)]
+    payload = _answer_payload("List ids", {"columns": ("EmployeeId",), "rows": rows})
+    assert payload["rows"] == rows[:ANSWER_MAX_ROWS]
+    assert payload["_truncated"] == "5"
+
+
+def test_fetch_that_hit_the_row_limit_is_counted_as_at_least():
+    rows = [(i,) for i in range(RESULT_ROW_LIMIT)]
+    payload = _answer_payload("List ids", {"columns": ("EmployeeId",), "rows": rows})
+    assert payload["_truncated"] == f"{RESULT_ROW_LIMIT - ANSWER_MAX_ROWS}+"
+
+
+def test_wide_result_keeps_mentioned_and_name_columns():
+    assert len(WIDE) > ANSWER_WIDE_COLUMNS
+    row = tuple(range(len(WIDE)))
+    payload = _answer_payload("What is each joining date and city?", {"columns": WIDE, "rows": [row]})
+    assert payload["columns"] == ("EmployeeName", "JoiningDate", "DepartmentName", "ManagerName", "City")
+    assert payload["rows"] == [(1, 2, 3, 4, 7)]
+
+
+def test_wide_result_keeps_every_column_when_nothing_matches():
+    columns = tuple(f"Col{i}" for i in range(ANSWER_WIDE_COLUMNS + 1))
+    data = {"columns": columns, "rows": [tuple(range(len(columns)))]}
+    assert _answer_payload("Anything?", data)["columns"] == columns
@@ -0,0 +1,94 @@
+import asyncio
+import math
+
+import numpy as np
+import pytest
+
+import groq_trial2
+
+
+def unit(cosine):
+    """A 2-d unit vector whose cosine with (1, 0) is the given value."""
+    vector = np.array([cosine, math.sqrt(1 - cosine ** 2)])
+    vector.setflags(write=False)
+    return vector
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    vectors = {}
+    monkeypatch.setattr(groq_trial2, "embed_text", lambda text: vectors[text])
+    cache = groq_trial2.QueryCache()
+    monkeypatch.setattr(groq_trial2, "query_cache", cache)
+    cache.vectors = vectors
+    return cache
+
+
+@pytest.fixture
+def executed(monkeypatch):
+    calls = []
+
+    async def execute_sql(sql, conn=None):
+        calls.append(sql)
+        return {"columns": ("EmployeeName",), "rows": [("Asha",)]}
+
+    monkeypatch.setattr(groq_trial2, "execute_sql", execute_sql)
+    return calls
+
+
+def lookup(question):
+    return asyncio.run(groq_trial2._cached_sql(question))
+
+
+def test_exact_hit_reuses_sql_and_template(cache, executed):
+    cache.vectors["employees who joined in 2021"] = unit(1.0)
+    cache.set("Employees who joined in 2021", "SELECT 2021", ("EmployeeName",), answer_template="{EmployeeName}")
+    assert lookup("employees who joined in 2021") == (
+        "SELECT 2021", {"columns": ("EmployeeName",), "rows": [("Asha",)]}, "{EmployeeName}"
+    )
+
+
+def test_high_similarity_with_different_year_is_a_miss(cache, executed):
+    cache.vectors["employees who joined in 2021"] = unit(1.0)
+    cache.vectors["employees who joined in 2022"] = unit(0.97)
+    cache.set("Employees who joined in 2021", "SELECT 2021", ("EmployeeName",))
+    assert lookup("Employees who joined in 2022") == (None, None, None)
+    assert executed == []
+
+
+def test_high_similarity_with_same_values_is_a_hit(cache, executed):
+    cache.vectors["who works in sales"] = unit(1.0)
+    cache.vectors["which people work in sales"] = unit(0.97)
+    cache.set("Who works in Sales", "SELECT sales", ("EmployeeName",), answer_template="{EmployeeName}")
+    sql, _, template = lookup("Which people work in Sales")
+    assert sql == "SELECT sales"
+    assert template == "{EmployeeName}"
+
+
+def test_gray_zone_hit_drops_template(cache, executed):
+    cache.vectors["who works in sales"] = unit(1.0)
+    cache.vectors["list people working in sales"] = unit(0.9)
+    cache.set("Who works in Sales", "SELECT sales", ("EmployeeName",), answer_template="{EmployeeName}")
+    assert lookup("List people working in Sales")[::2] == ("SELECT sales", None)
+
+
+def test_gray_zone_hit_with_other_columns_is_a_miss(cache, executed):
+    cache.vectors["who works in sales"] = unit(1.0)
+    cache.vectors["list people working in sales"] = unit(0.9)
+    cache.set("Who works in Sales", "SELECT sales", ("EmployeeName", "Department"))
+    assert lookup("List people working in Sales") == (None, None, None)
+
+
+def test_negative_hit_raises_cached_error(cache, executed):
+    cache.vectors["drop the employee table"] = unit(1.0)
+    cache.vectors["please drop the employee table"] = unit(0.97)
+    cache.set("drop the employee table", None, status="unsafe", error="Unsafe SQL detected", ttl=60)
+    with pytest.raises(ValueError, match="Unsafe SQL detected"):
+        lookup("please drop the employee table")
+
+
+def test_negative_entry_does_not_block_other_filter_values(cache, executed):
+    cache.vectors["salary of employee 1001"] = unit(1.0)
+    cache.vectors["salary of employee 1002"] = unit(0.97)
+    cache.set("salary of employee 1001", "SELECT bad", status="syntax_error", error="Invalid column", ttl=60)
+    assert lookup("salary of employee 1002") == (None, None, None)
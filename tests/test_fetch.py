@@ -0,0 +1,65 @@
+import pytest
+
+from groq_trial2 import UnsafeSQLError, _fetch
+
+
+class FakeCursor:
+    def __init__(self, rows=(), fail_on=()):
+        self.rows = list(rows)
+        self.fail_on = fail_on
+        self.executed = []
+        self.description = [("Name",), ("Age",)]
+
+    def execute(self, statement, params=None):
+        self.executed.append(statement)
+        for text, error in self.fail_on:
+            if statement.startswith(text):
+                raise error
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.closed = False
+        self.invalidated = False
+
+    def cursor(self):
+        return self._cursor
+
+    def close(self):
+        self.closed = True
+
+    def invalidate(self):
+        self.invalidated = True
+
+
+def test_fetch_limits_rows_and_resets_rowcount():
+    cursor = FakeCursor(rows=[("A", 1), ("B", 2), ("C", 3)])
+    conn = FakeConnection(cursor)
+    data = _fetch(conn, "SELECT Name, Age FROM dbo.T", limit=2)
+    assert data == {"columns": ("Name", "Age"), "rows": [("A", 1), ("B", 2)]}
+    assert cursor.executed[0] == "SET ROWCOUNT 2"
+    assert cursor.executed[-1] == "SET ROWCOUNT 0"
+    assert conn.closed and not conn.invalidated
+
+
+def test_fetch_closes_connection_when_sql_is_rejected():
+    conn = FakeConnection(FakeCursor())
+    with pytest.raises(UnsafeSQLError):
+        _fetch(conn, "DELETE FROM dbo.T")
+    assert conn.closed
+
+
+def test_fetch_raises_query_error_when_reset_also_fails():
+    class QueryError(Exception):
+        pass
+
+    cursor = FakeCursor(fail_on=[("SELECT", QueryError("bad column")), ("SET ROWCOUNT 0", OSError("gone"))])
+    conn = FakeConnection(cursor)
+    with pytest.raises(QueryError, match="bad column"):
+        _fetch(conn, "SELECT Name FROM dbo.T")
+    assert conn.invalidated and conn.closed
@@ -0,0 +1,85 @@
+import pytest
+
+from groq_trial2 import parameterize_sql
+
+
+def split(sql):
+    statement, params = parameterize_sql(sql)
+    assert statement.startswith("EXEC sp_executesql %s, %s")
+    query, declarations, *values = params
+    return query, declarations, values
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT COUNT(*) AS EmployeeCount FROM dbo.Employee",
+    "SELECT x FROM dbo.T WHERE y > 1.5",
+    "SELECT TOP (5) e.Name FROM dbo.Employee e ORDER BY e.Name",
+    "SELECT oops FROM (",
+])
+def test_unchanged_without_parameterizable_literals(sql):
+    assert parameterize_sql(sql) == (sql, None)
+
+
+@pytest.mark.parametrize("expression", [
+    "DATEFROMPARTS(YEAR(GETDATE()), 1, 1)",
+    "DATEPART(YEAR, e.JoiningDate)",
+    "DATENAME(MONTH, e.JoiningDate)",
+    "ISNULL(e.Bonus, 0)",
+    "DATEDIFF(DAY, e.JoiningDate, EOMONTH(GETDATE()))",
+])
+def test_tsql_functions_are_kept_verbatim(expression):
+    sql = f"SELECT {expression} AS v FROM dbo.Employee e WHERE e.Dept = 'Sales' AND {expression} > 2"
+    query, _, values = split(sql)
+    assert query == sql.replace("'Sales'", "@p0").replace("> 2", "> @p1")
+    assert values == ["Sales", 2]
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT TOP (10) PERCENT n FROM dbo.T WHERE x = 'a'",
+    "SELECT TOP (10) PERCENT e.Name FROM dbo.Employee e WHERE e.Dept = 'Sales'",
+])
+def test_top_percent_is_kept_verbatim(sql):
+    statement, params = parameterize_sql(sql)
+    query = params[0] if params else statement
+    assert query.startswith("SELECT TOP (10) PERCENT ")
+    assert query.replace("@p0", "'a'" if "x =" in sql else "'Sales'") == sql
+
+
+def test_join_and_where_literals_are_spliced_in_order():
+    sql = (
+        "SELECT e.Name FROM dbo.Employee e "
+        "LEFT JOIN dbo.Department d ON d.Id = e.DeptId AND d.Active = 1 "
+        "WHERE d.Name = N'Sales' AND e.Age > -3 AND e.Code IN ('A', 'B''C')"
+    )
+    query, declarations, values = split(sql)
+    assert query == (
+        "SELECT e.Name FROM dbo.Employee e "
+        "LEFT JOIN dbo.Department d ON d.Id = e.DeptId AND d.Active = @p0 "
+        "WHERE d.Name = @p1 AND e.Age > -@p2 AND e.Code IN (@p3, @p4)"
+    )
+    assert values == [1, "Sales", 3, "A", "B'C"]
+    assert declarations == "@p0 int, @p1 nvarchar(4000), @p2 int, @p3 varchar(8000), @p4 varchar(8000)"
+
+
+def test_literals_outside_comparisons_are_left_alone():
+    sql = "SELECT CAST(e.Code AS varchar(10)) FROM dbo.Employee e WHERE LEFT(e.Code, 2) = 'AB'"
+    query, _, values = split(sql)
+    assert query == "SELECT CAST(e.Code AS varchar(10)) FROM dbo.Employee e WHERE LEFT(e.Code, 2) = @p0"
+    assert values == ["AB"]
+
+
+def test_large_integers_are_bigint():
+    _, declarations, values = split("SELECT x FROM dbo.T WHERE id = 5000000000")
+    assert declarations == "@p0 bigint"
+    assert values == [5000000000]
+
+
+def test_integers_beyond_bigint_stay_literal():
+    sql = "SELECT x FROM dbo.T WHERE id = 99999999999999999999 AND code = 'A'"
+    query, declarations, values = split(sql)
+    assert query == "SELECT x FROM dbo.T WHERE id = 99999999999999999999 AND code = @p0"
+    assert declarations == "@p0 varchar(8000)"
+    assert values == ["A"]
+    assert parameterize_sql("SELECT x FROM dbo.T WHERE id = 9223372036854775808") == (
+        "SELECT x FROM dbo.T WHERE id = 9223372036854775808", None
+    )
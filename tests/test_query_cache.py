@@ -0,0 +1,103 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import groq_trial2
+from groq_trial2 import NEGATIVE_CACHE_TTL_SECONDS, QueryCache, UnsafeSQLError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(groq_trial2.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def embed(monkeypatch):
+    vectors = {}
+    monkeypatch.setattr(groq_trial2, "embed_text", lambda text: vectors.get(text, np.array([1.0, 0.0])))
+    return vectors
+
+
+def test_negative_entries_expire_after_ttl(clock, embed):
+    cache = QueryCache()
+    cache.set("drop the employee table", None, status="unsafe", error="Unsafe SQL detected", ttl=60)
+    entry, _, exact = cache.get("drop the employee table")
+    assert exact and entry["status"] == "unsafe" and entry["error"] == "Unsafe SQL detected"
+    clock.now += 60
+    assert cache.get("drop the employee table") == (None, 0.0, False)
+    assert not cache._entries
+
+
+def test_ok_entries_do_not_expire(clock, embed):
+    cache = QueryCache()
+    cache.set("how many employees", "SELECT COUNT(*) FROM dbo.Employee", ("EmployeeCount",))
+    clock.now += 10 ** 6
+    entry, _, _ = cache.get("how many employees")
+    assert entry["status"] == "ok" and entry["columns"] == {"EmployeeCount"}
+
+
+def test_least_recently_used_entry_is_evicted(clock, embed):
+    embed.update({"a": np.array([1.0, 0.0]), "b": np.array([0.0, 1.0]), "c": np.array([-1.0, 0.0])})
+    cache = QueryCache(maxsize=2)
+    cache.set("a", "SELECT 1")
+    cache.set("b", "SELECT 2")
+    cache.get("a")
+    cache.set("c", "SELECT 3")
+    assert cache.get("b") == (None, 0.0, False)
+    assert cache.get("a")[0]["sql"] == "SELECT 1"
+
+
+@pytest.fixture
+def bot(monkeypatch, clock, embed):
+    """ask_hr_bot with the schema, connection and model stubbed out."""
+    state = SimpleNamespace(calls=[], error=None)
+
+    class Connection:
+        def close(self):
+            pass
+
+    async def generate_sql_and_plan(question, schema):
+        state.calls.append(question)
+        raise state.error
+
+    monkeypatch.setattr(groq_trial2, "query_cache", QueryCache())
+    monkeypatch.setattr(groq_trial2, "load_schema", lambda: {})
+    monkeypatch.setattr(groq_trial2, "get_connection", Connection)
+    monkeypatch.setattr(groq_trial2, "generate_sql_and_plan", generate_sql_and_plan)
+    return state
+
+
+def ask(question):
+    return asyncio.run(groq_trial2.ask_hr_bot(question))
+
+
+def test_unsafe_sql_fails_fast_until_ttl(bot, clock):
+    bot.error = UnsafeSQLError("Unsafe SQL detected")
+    for _ in range(2):
+        with pytest.raises(ValueError, match="Unsafe SQL detected"):
+            ask("drop the employee table")
+    assert len(bot.calls) == 1
+    clock.now += NEGATIVE_CACHE_TTL_SECONDS
+    with pytest.raises(UnsafeSQLError):
+        ask("drop the employee table")
+    assert len(bot.calls) == 2
+
+
+def test_other_generation_errors_are_not_cached(bot):
+    bot.error = ValueError("Model returned invalid JSON")
+    for _ in range(2):
+        with pytest.raises(ValueError, match="invalid JSON"):
+            ask("who joined last")
+    assert len(bot.calls) == 2
@@ -0,0 +1,24 @@
+from groq_trial2 import question_literals
+
+
+def test_filter_values_distinguish_near_duplicates():
+    assert question_literals("Who works in Sales?") != question_literals("Who works in Marketing?")
+    assert question_literals("Employees who joined in 2021") != question_literals("Employees who joined in 2022")
+    assert question_literals('Find employee "ravi kumar"') != question_literals('Find employee "anita rao"')
+
+
+def test_leading_filter_values_are_kept():
+    assert question_literals("2021 joiners") == {"2021"}
+    assert question_literals("2021 joiners") != question_literals("2022 joiners")
+    assert question_literals("Sales staff count") == {"sales"}
+    assert question_literals("Sales staff count") != question_literals("Marketing staff count")
+    assert question_literals("'R&D' headcount") == {"r&d"}
+
+
+def test_rephrasings_with_the_same_values_match():
+    assert question_literals("Who works in Sales?") == question_literals("Which people work in Sales")
+    assert question_literals("how many employees are there") == question_literals("Count all employees") == frozenset()
+
+
+def test_extracted_values():
+    assert question_literals("List staff in 'R&D' hired after 2020 by John's team") == {"r&d", "2020", "john"}
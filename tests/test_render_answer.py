@@ -0,0 +1,53 @@
+from datetime import date
+
+import pytest
+
+from groq_trial2 import ANSWER_MAX_ROWS, RESULT_ROW_LIMIT, render_answer
+
+
+def result(*rows, columns=("EmployeeName", "JoiningDate")):
+    return {"columns": columns, "rows": list(rows)}
+
+
+def test_single_row_is_a_plain_line():
+    data = result(("Ravi", date(2021, 3, 1)))
+    assert render_answer("{EmployeeName} joined on {JoiningDate}", data) == "Ravi joined on 2021-03-01"
+
+
+def test_multiple_rows_are_numbered_and_none_is_na():
+    data = result(("Ravi", date(2021, 3, 1)), ("Anita", None))
+    assert render_answer("{EmployeeName} joined on {JoiningDate}", data) == (
+        "1. Ravi joined on 2021-03-01\n2. Anita joined on N/A"
+    )
+
+
+@pytest.mark.parametrize("template", [
+    "{JoiningDate:%d %B %Y}",
+    "{EmployeeName!r}",
+    "{EmployeeName.upper}",
+    "{EmployeeName[0]}",
+    "{Department}",
+    "No placeholders here",
+    "{EmployeeName",
+    "",
+    None,
+])
+def test_unusable_templates_fall_back(template):
+    assert render_answer(template, result(("Ravi", date(2021, 3, 1)))) is None
+
+
+def test_no_rows_falls_back():
+    assert render_answer("{EmployeeName}", result()) is None
+
+
+def test_rows_beyond_the_limit_are_counted():
+    rows = [(f"E{i}", None) for i in range(ANSWER_MAX_ROWS + 3)]
+    answer = render_answer("{EmployeeName}", result(*rows))
+    assert answer.count("\n") == ANSWER_MAX_ROWS - 1 + 2
+    assert answer.endswith("\n\n...and 3 more.")
+
+
+def test_truncated_fetch_is_counted_as_at_least():
+    rows = [(f"E{i}", None) for i in range(RESULT_ROW_LIMIT)]
+    answer = render_answer("{EmployeeName}", result(*rows))
+    assert answer.endswith(f"...and {RESULT_ROW_LIMIT - ANSWER_MAX_ROWS}+ more.")
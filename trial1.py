@@ -1,6 +1,9 @@
 import streamlit as st
+import asyncio
+import threading
 import time
-from groq_trial2 import ask_hr_bot
+from collections import deque
+from groq_trial2 import ask_hr_bot, load_schema, _embedder_singleton
 
 # ----------------------------
 # PAGE CONFIG
@@ -11,22 +14,86 @@ st.set_page_config(
     layout="centered"
 )
 
+# ----------------------------
+# EVENT LOOP
+# ----------------------------
+# One long-lived loop shared by all sessions: the async Groq client keeps
+# pooled connections that are bound to the loop they were opened on.
+@st.cache_resource
+def _event_loop():
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+def run_async(coro):
+    return asyncio.run_coroutine_threadsafe(coro, _event_loop()).result()
+
+async def _anext(agen):
+    return await agen.__anext__()
+
+def iter_async(agen):
+    """Drive an async generator on the shared loop as a plain generator."""
+    while True:
+        try:
+            yield run_async(_anext(agen))
+        except StopAsyncIteration:
+            return
+
+# ----------------------------
+# WARM-UP
+# ----------------------------
+# Runs once per process so the first question doesn't pay for model
+# loading, schema introspection or the first DB connect.
+WARM_RETRY_SECONDS = 60
+
+@st.cache_resource
+def _warm():
+    _embedder_singleton()
+    schema = load_schema()  # also opens the first pooled connection
+    return schema
+
 # ----------------------------
 # HEADER
 # ----------------------------
 st.title("🤖 KompassHR AI Assistant")
 st.caption("Ask HR questions in natural language")
 
+# Not cached on failure, so back off instead of retrying (and waiting on a
+# DB timeout) on every rerun while the database is down.
+if time.monotonic() >= st.session_state.get("warm_retry_at", 0.0):
+    try:
+        _warm()
+        st.session_state.pop("warm_error", None)
+    except Exception as e:
+        st.session_state.warm_error = str(e)
+        st.session_state.warm_retry_at = time.monotonic() + WARM_RETRY_SECONDS
+
+if "warm_error" in st.session_state:
+    st.warning(f"⚠️ Warm-up failed: {st.session_state.warm_error}")
+
 # ----------------------------
 # SESSION STATE
 # ----------------------------
+# Bounded so each rerun renders a fixed amount of history
+MAX_MESSAGES = 40
+VISIBLE_MESSAGES = 20
+
 if "messages" not in st.session_state:
-    st.session_state.messages = []
+    st.session_state.messages = deque(maxlen=MAX_MESSAGES)
 
 # ----------------------------
 # DISPLAY CHAT HISTORY
 # ----------------------------
-for msg in st.session_state.messages:
+history = list(st.session_state.messages)
+earlier, recent = history[:-VISIBLE_MESSAGES], history[-VISIBLE_MESSAGES:]
+
+if earlier:
+    with st.expander("Earlier messages"):
+        for msg in earlier:
+            with st.chat_message(msg["role"]):
+                st.markdown(msg["content"])
+
+for msg in recent:
     with st.chat_message(msg["role"]):
         st.markdown(msg["content"])
 
@@ -49,19 +116,14 @@ if user_input:
     with st.chat_message("assistant"):
         placeholder = st.empty()
 
-        with st.spinner("Thinking..."):
-            try:
-                result = ask_hr_bot(user_input)
-                answer = result["answer"]  # ❌ no raw_data, no SQL shown
-            except Exception as e:
-                answer = f"❌ Error: {str(e)}"
-
-        # Typing effect (ChatGPT style)
-        full_text = ""
-        for word in answer.split():
-            full_text += word + " "
-            time.sleep(0.02)
-            placeholder.markdown(full_text)
+        try:
+            with st.spinner("Thinking..."):
+                result = run_async(ask_hr_bot(user_input))
+            # Render tokens as Groq streams them; ❌ no raw_data, no SQL shown
+            answer = placeholder.write_stream(iter_async(result["answer"]))
+        except Exception as e:
+            answer = f"❌ Error: {str(e)}"
+            placeholder.markdown(answer)
 
     st.session_state.messages.append({
         "role": "assistant",